@@ -2,15 +2,22 @@ from time import time
 from flask import Flask, request, redirect, render_template, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import func, text
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timezone
+import os
+import logging
+import threading
 import requests
+import perfil
 
 app = Flask(__name__)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db' 
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+app.logger.setLevel(logging.INFO)
+perfil.init_app(app)
 
 @dataclass
 class Cliente(db.Model):
@@ -44,8 +51,8 @@ class Transacao(db.Model):
     status: int
     
     id = db.Column(db.Integer, primary_key=True)
-    remetente = db.Column(db.Integer, unique=False, nullable=False)
-    recebedor = db.Column(db.Integer, unique=False, nullable=False)
+    remetente = db.Column(db.Integer, unique=False, nullable=False, index=True)
+    recebedor = db.Column(db.Integer, unique=False, nullable=False, index=True)
     valor = db.Column(db.Integer, unique=False, nullable=False)
     horario = db.Column(db.DateTime, unique=False, nullable=False)
     status = db.Column(db.Integer, unique=False, nullable=False)
@@ -61,8 +68,196 @@ class Transacao(db.Model):
             'status': self.status
         }
 
+# Saldo de um cliente após aplicar todas as transações com id <= transacao_id.
+# O saldo em qualquer horário é o checkpoint mais recente até ele mais o replay das
+# transações seguintes, sem precisar varrer a tabela Transacao inteira.
+@dataclass
+class SaldoCheckpoint(db.Model):
+    id: int
+    cliente: int
+    transacao_id: int
+    saldo: int
+    horario: datetime
+
+    id = db.Column(db.Integer, primary_key=True)
+    cliente = db.Column(db.Integer, unique=False, nullable=False, index=True)
+    transacao_id = db.Column(db.Integer, unique=False, nullable=False)
+    saldo = db.Column(db.Integer, unique=False, nullable=False)
+    horario = db.Column(db.DateTime, unique=False, nullable=False)
+
+# Checkpoint mais recente de cada cliente, atualizado junto com cada SaldoCheckpoint, para
+# não agrupar a tabela de checkpoints inteira (que só cresce) a cada execução.
+@dataclass
+class UltimoCheckpoint(db.Model):
+    cliente: int
+    transacao_id: int
+    saldo: int
+
+    cliente = db.Column(db.Integer, primary_key=True)
+    transacao_id = db.Column(db.Integer, unique=False, nullable=False)
+    saldo = db.Column(db.Integer, unique=False, nullable=False)
+
+# Última transação já aplicada por gerar_checkpoints (linha única, id=1). Todo cliente
+# com transações até essa marca tem um checkpoint nela ou depois dela, então o replay
+# começa daqui mesmo que clientes inativos tenham checkpoints antigos.
+@dataclass
+class MarcaReplay(db.Model):
+    id: int
+    transacao_id: int
+
+    id = db.Column(db.Integer, primary_key=True)
+    transacao_id = db.Column(db.Integer, unique=False, nullable=False)
+
 with app.app_context():
     db.create_all()
+    # create_all não cria índices em tabelas que já existem (ex.: instance/site.db).
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_transacao_remetente ON transacao (remetente)'))
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_transacao_recebedor ON transacao (recebedor)'))
+
+    # Bancos com checkpoints anteriores à tabela UltimoCheckpoint: preenche uma única vez.
+    if not db.session.query(UltimoCheckpoint.cliente).first():
+        ultimos = db.session.query(func.max(SaldoCheckpoint.id)).group_by(SaldoCheckpoint.cliente)
+        for cp in SaldoCheckpoint.query.filter(SaldoCheckpoint.id.in_(ultimos)):
+            db.session.add(UltimoCheckpoint(cliente=cp.cliente, transacao_id=cp.transacao_id, saldo=cp.saldo))
+    db.session.commit()
+
+def ultima_transacao_id():
+    return db.session.query(func.max(Transacao.id)).scalar() or 0
+
+def marca_replay():
+    marca = db.session.get(MarcaReplay, 1)
+    return marca.transacao_id if marca else 0
+
+# Abre uma transação em que saldos e ledger são lidos no mesmo estado do banco.
+# No SQLite, BEGIN IMMEDIATE também impede novas escritas até o commit/rollback;
+# nos demais bancos a transação roda em SERIALIZABLE.
+def iniciar_snapshot():
+    db.session.commit()
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('BEGIN IMMEDIATE'))
+    else:
+        db.session.connection(execution_options={'isolation_level': 'SERIALIZABLE'})
+
+# Grava um checkpoint e atualiza o ponteiro para o mais recente do cliente.
+def adicionar_checkpoint(cliente, transacao_id, saldo, horario):
+    db.session.add(SaldoCheckpoint(cliente=cliente, transacao_id=transacao_id, saldo=saldo, horario=horario))
+    db.session.merge(UltimoCheckpoint(cliente=cliente, transacao_id=transacao_id, saldo=saldo))
+
+# Checkpoint mais recente de cada cliente existente: {cliente: (transacao_id, saldo)}.
+def ultimos_checkpoints():
+    checkpoints = db.session.query(UltimoCheckpoint).join(Cliente, Cliente.id == UltimoCheckpoint.cliente)
+    return {cp.cliente: (cp.transacao_id, cp.saldo) for cp in checkpoints}
+
+# Aplica, em uma única passada ordenada pela tabela Transacao a partir de desde, as
+# transações posteriores ao checkpoint de cada cliente. Devolve {cliente: saldo} e o
+# conjunto de clientes que tiveram alguma transação aplicada.
+def replay_ledger(checkpoints, desde, ate_id=None):
+    saldos = {cliente: saldo for cliente, (_, saldo) in checkpoints.items()}
+    alterados = set()
+    if not checkpoints:
+        return saldos, alterados
+
+    consulta = db.session.query(Transacao.id, Transacao.remetente, Transacao.recebedor, Transacao.valor)
+    consulta = consulta.filter(Transacao.id > desde)
+    if ate_id is not None:
+        consulta = consulta.filter(Transacao.id <= ate_id)
+
+    for id, rem, reb, valor in consulta.order_by(Transacao.id).yield_per(1000):
+        if rem in saldos and id > checkpoints[rem][0]:
+            saldos[rem] -= valor
+            alterados.add(rem)
+        if reb in saldos and id > checkpoints[reb][0]:
+            saldos[reb] += valor
+            alterados.add(reb)
+    return saldos, alterados
+
+# Cria um checkpoint novo para cada cliente com transações desde o último e avança a marca.
+# Clientes antigos, sem nenhum checkpoint, recebem um checkpoint base (antes de qualquer
+# transação) calculado a partir do saldo atual menos o efeito de todas as transações,
+# e um checkpoint com o saldo atual.
+def gerar_checkpoints():
+    iniciar_snapshot()
+    ate_id = ultima_transacao_id()
+    desde = marca_replay()
+    checkpoints = ultimos_checkpoints()
+    agora = datetime.utcnow()
+    criados = 0
+
+    sem_checkpoint = {c.id: c.qtdMoeda for c in Cliente.query.all() if c.id not in checkpoints}
+    if sem_checkpoint:
+        enviados = dict(db.session.query(Transacao.remetente, func.sum(Transacao.valor))
+                        .filter(Transacao.remetente.in_(sem_checkpoint), Transacao.id <= ate_id)
+                        .group_by(Transacao.remetente).all())
+        recebidos = dict(db.session.query(Transacao.recebedor, func.sum(Transacao.valor))
+                         .filter(Transacao.recebedor.in_(sem_checkpoint), Transacao.id <= ate_id)
+                         .group_by(Transacao.recebedor).all())
+        for cliente, saldo in sem_checkpoint.items():
+            base = saldo + enviados.get(cliente, 0) - recebidos.get(cliente, 0)
+            adicionar_checkpoint(cliente, 0, base, datetime.min)
+            adicionar_checkpoint(cliente, ate_id, saldo, agora)
+            criados += 2
+
+    saldos, alterados = replay_ledger(checkpoints, desde, ate_id)
+    for cliente in alterados:
+        adicionar_checkpoint(cliente, ate_id, saldos[cliente], agora)
+        criados += 1
+
+    marca = db.session.get(MarcaReplay, 1) or MarcaReplay(id=1)
+    marca.transacao_id = ate_id
+    db.session.add(marca)
+    db.session.commit()
+    return criados
+
+# Confere o saldo atual de todos os clientes contra o ledger a partir dos checkpoints.
+def reconciliar_clientes():
+    iniciar_snapshot()
+    try:
+        checkpoints = ultimos_checkpoints()
+        saldos, _ = replay_ledger(checkpoints, marca_replay())
+        divergencias = []
+        for cliente in Cliente.query.all():
+            if cliente.id not in saldos:
+                divergencias.append({'cliente': cliente.id, 'erro': 'Cliente sem checkpoint.'})
+            elif saldos[cliente.id] != cliente.qtdMoeda:
+                divergencias.append({'cliente': cliente.id, 'saldo': cliente.qtdMoeda, 'ledger': saldos[cliente.id]})
+        return divergencias
+    finally:
+        db.session.rollback()
+
+@app.cli.command('checkpoints')
+def ComandoCheckpoints():
+    print(f'{gerar_checkpoints()} checkpoints criados.')
+
+@app.cli.command('reconciliar')
+def ComandoReconciliar():
+    divergencias = reconciliar_clientes()
+    for divergencia in divergencias:
+        print(divergencia)
+    print(f'{len(divergencias)} divergências encontradas.')
+
+# Gera checkpoints a cada CHECKPOINT_INTERVALO segundos enquanto o servidor roda.
+def agendar_checkpoints(intervalo):
+    parar = threading.Event()
+
+    def executar():
+        while not parar.wait(intervalo):
+            with app.app_context():
+                try:
+                    gerar_checkpoints()
+                except Exception as e:
+                    app.logger.error(f'Erro ao gerar checkpoints: {e}')
+
+    threading.Thread(target=executar, daemon=True).start()
+    return parar
+
+# Inicia os checkpoints periódicos se CHECKPOINT_INTERVALO estiver definido. Com o reloader
+# do debug, só o processo filho (que atende as requisições) agenda.
+def iniciar_checkpoints_periodicos(debug):
+    intervalo = float(os.environ.get('CHECKPOINT_INTERVALO', '0'))
+    if intervalo > 0 and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        app.logger.info(f'Checkpoints periódicos a cada {intervalo}s.')
+        return agendar_checkpoints(intervalo)
+    return None
 
 @app.route("/")
 def index():
@@ -79,6 +274,10 @@ def InserirCliente(nome, senha, qtdMoeda):
     if request.method=='POST' and nome != '' and senha != '' and qtdMoeda != '':
         objeto = Cliente(nome=nome, senha=senha, qtdMoeda=qtdMoeda)
         db.session.add(objeto)
+        db.session.flush()
+
+        # Checkpoint inicial, no mesmo commit do cliente: o saldo de criação não aparece na tabela de transações.
+        adicionar_checkpoint(objeto.id, ultima_transacao_id(), qtdMoeda, datetime.utcnow())
         db.session.commit()
         return jsonify(objeto)
     else:
@@ -92,6 +291,42 @@ def UmCliente(id):
     else:
         return jsonify(['Method Not Allowed'])
 
+@app.route('/cliente/<int:id>/saldo', methods = ['GET'])
+def SaldoCliente(id):
+    cliente = db.session.get(Cliente, id)
+    if not cliente:
+        return jsonify({'error': 'Cliente não encontrado.'}), 404
+
+    em = request.args.get('em')
+    try:
+        momento = datetime.fromisoformat(em) if em else datetime.utcnow()
+    except ValueError:
+        return jsonify({'error': 'Horário inválido, use o formato ISO 8601.'}), 400
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+    checkpoint = SaldoCheckpoint.query.filter(
+        SaldoCheckpoint.cliente == id,
+        SaldoCheckpoint.horario <= momento
+    ).order_by(SaldoCheckpoint.transacao_id.desc(), SaldoCheckpoint.id.desc()).first()
+    if not checkpoint:
+        return jsonify({'error': 'Sem checkpoint para o cliente até o horário informado.'}), 404
+
+    # Replay incremental apenas das transações entre o checkpoint e o horário pedido.
+    posteriores = db.session.query(func.coalesce(func.sum(Transacao.valor), 0)).filter(
+        Transacao.id > checkpoint.transacao_id,
+        Transacao.horario <= momento
+    )
+    recebido = posteriores.filter(Transacao.recebedor == id).scalar()
+    enviado = posteriores.filter(Transacao.remetente == id).scalar()
+
+    return jsonify({
+        'cliente': id,
+        'em': momento.isoformat(),
+        'saldo': checkpoint.saldo + recebido - enviado,
+        'checkpoint': checkpoint.id
+    })
+
 @app.route('/cliente/<int:id>/<int:qtdMoedas>', methods=["POST"])
 def EditarCliente(id, qtdMoedas):
     if request.method=='POST':
@@ -210,9 +445,8 @@ def CriaTransacao(rem, reb, valor):
     # Atualiza os saldos dos clientes
     remetente.qtdMoeda -= valor
     recebedor.qtdMoeda += valor
-    db.session.commit()
 
-    # Cria a transação
+    # Cria a transação no mesmo commit dos saldos, para o ledger nunca ficar atrás deles.
     transacao = Transacao(
         remetente=rem,
         recebedor=reb,
@@ -228,7 +462,8 @@ def CriaTransacao(rem, reb, valor):
     # Envia a transação para o serviço seletor
     url_seletor = "http://seletor:5001/transacoes"  # Usando o nome do serviço no Docker Compose
     try:
-        response = requests.post(url_seletor, json=transacao_dict)
+        with perfil.fase('seletor'):
+            response = requests.post(url_seletor, json=transacao_dict, headers=perfil.cabecalhos())
         if response.status_code == 200:
             return jsonify({'message': 'Transação criada e enviada com sucesso!'}), 200
         elif response.status_code == 503:
@@ -272,9 +507,14 @@ def EditaTransacao(id, status):
 def page_not_found(error):
     return render_template('page_not_found.html'), 404
 
+# Importado por `flask run` ou por um servidor WSGI: o bloco abaixo não roda nesses casos.
+if __name__ != "__main__":
+    iniciar_checkpoints_periodicos(app.debug)
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+    iniciar_checkpoints_periodicos(debug=True)
     app.run(host='0.0.0.0', port=5000, debug=True)
 
 
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import bisect
+import math
+import random
+import time
+from collections import Counter
+
+import aiohttp
+
+
+######################################################################################################
+# Gerador de carga em malha aberta para a pilha banco/seletor/validador.
+#
+# Exemplo (dependências em requirements.txt, na raiz):
+#   python carga.py --clientes 100 --validadores 4 --taxa 50 --duracao 60 --zipf 1.1
+#
+# As transferências são disparadas em horários planejados (taxa fixa ou Poisson),
+# independente de quanto o servidor demora para responder. A latência de cada
+# requisição é medida a partir do horário planejado, e não do envio real, para
+# corrigir a omissão coordenada: se o gerador atrasar porque o servidor está lento,
+# esse atraso entra na medida.
+
+
+######################################################################################################
+# Histograma no estilo HDR: baldes logarítmicos com subdivisão linear, precisão relativa
+# limitada pelo número de sub-baldes (128 => ~1% de erro), memória constante.
+class Histograma:
+    SUB_BALDES = 128
+
+    def __init__(self):
+        self.contagens = Counter()
+        self.total = 0
+        self.soma = 0
+        self.minimo = None
+        self.maximo = 0
+
+    # Converte um valor em microssegundos no índice do seu balde.
+    def _indice(self, valor):
+        if valor < self.SUB_BALDES:
+            return valor
+        expoente = valor.bit_length() - self.SUB_BALDES.bit_length()
+        return (expoente + 1) * self.SUB_BALDES + (valor >> expoente) - self.SUB_BALDES
+
+    # Menor valor representado por um balde (inverso de _indice).
+    def _valor(self, indice):
+        if indice < self.SUB_BALDES:
+            return indice
+        expoente = indice // self.SUB_BALDES - 1
+        return (indice % self.SUB_BALDES + self.SUB_BALDES) << expoente
+
+    def registrar(self, valor):
+        valor = max(0, int(valor))
+        self.contagens[self._indice(valor)] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+
+    def percentil(self, p):
+        if self.total == 0:
+            return 0
+        alvo = max(1, math.ceil(self.total * p / 100))
+        acumulado = 0
+        for indice in sorted(self.contagens):
+            acumulado += self.contagens[indice]
+            if acumulado >= alvo:
+                return min(self._valor(indice + 1) - 1, self.maximo)
+        return self.maximo
+
+    def media(self):
+        return self.soma / self.total if self.total else 0
+
+
+######################################################################################################
+# Distribuição Zipf sobre as contas: a conta de posto k é escolhida com peso 1/k^s.
+# Com s=0 a escolha é uniforme.
+class Zipf:
+    def __init__(self, itens, s, rng):
+        self.itens = list(itens)
+        rng.shuffle(self.itens)  # O posto de cada conta não depende da ordem de criação.
+        acumulado = 0.0
+        self.acumulados = []
+        for k in range(1, len(self.itens) + 1):
+            acumulado += 1.0 / (k ** s)
+            self.acumulados.append(acumulado)
+        self.rng = rng
+
+    def escolher(self):
+        alvo = self.rng.random() * self.acumulados[-1]
+        return self.itens[bisect.bisect_left(self.acumulados, alvo)]
+
+
+######################################################################################################
+# Preparação: cria os clientes no banco e os validadores no seletor.
+async def criar_clientes(args, sessao):
+    ids = []
+    for i in range(args.clientes):
+        url = f"{args.banco}/cliente/{args.prefixo}cliente{i}/1234/{args.saldo}"
+        async with sessao.post(url, raise_for_status=True) as response:
+            ids.append((await response.json())['id'])
+    return ids
+
+
+async def criar_validadores(args, sessao):
+    for i in range(args.validadores):
+        # Os serviços do docker-compose se chamam validador1..validadorN.
+        ip = f"{args.host_validador}{i + 1}:{args.porta_validador + i}"
+        url = f"{args.seletor}/validador/{args.prefixo}validador{i}/{ip}"
+        async with sessao.post(url, raise_for_status=True):
+            pass
+
+
+######################################################################################################
+# Execução da carga.
+async def enviar_transacao(args, sessao, rem, reb, valor):
+    url = f"{args.banco}/transacoes/{rem}/{reb}/{valor}"
+    try:
+        async with sessao.post(url) as response:
+            await response.read()
+            return response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return type(e).__name__
+
+
+async def disparar(args, sessao, semaforo, planejado, rem, reb, valor, histogramas, resultados):
+    async with semaforo:
+        status = await enviar_transacao(args, sessao, rem, reb, valor)
+    # Latência a partir do horário planejado (correção de omissão coordenada).
+    # Sucessos e erros ficam em histogramas separados.
+    sucesso = isinstance(status, int) and status < 400
+    histogramas['sucesso' if sucesso else 'erro'].registrar((time.perf_counter() - planejado) * 1_000_000)
+    resultados[status] += 1
+
+
+async def gerar_carga(args, sessao, ids):
+    rng = random.Random(args.seed)
+    contas = Zipf(ids, args.zipf, rng)
+    histogramas = {'sucesso': Histograma(), 'erro': Histograma()}
+    resultados = Counter()
+    semaforo = asyncio.Semaphore(args.concorrencia)  # Limite de requisições simultâneas.
+    pendentes = set()  # Só as tarefas em andamento, para a memória não crescer com a duração.
+
+    inicio = time.perf_counter()
+    planejado = inicio
+    fim = inicio + args.duracao
+    while planejado < fim:
+        espera = planejado - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+        rem = contas.escolher()
+        reb = contas.escolher()
+        while reb == rem:
+            reb = contas.escolher()
+        valor = rng.randint(1, args.valor_max)
+
+        tarefa = asyncio.create_task(
+            disparar(args, sessao, semaforo, planejado, rem, reb, valor, histogramas, resultados)
+        )
+        pendentes.add(tarefa)
+        tarefa.add_done_callback(pendentes.discard)
+
+        # Próximo horário planejado, independente das respostas anteriores.
+        if args.poisson:
+            planejado += rng.expovariate(args.taxa)
+        else:
+            planejado += 1.0 / args.taxa
+
+    if pendentes:
+        await asyncio.gather(*pendentes)
+    decorrido = time.perf_counter() - inicio
+
+    return histogramas, resultados, decorrido
+
+
+# Uma única sessão aiohttp reaproveita as conexões; o pool tem o tamanho da concorrência.
+async def executar(args):
+    conector = aiohttp.TCPConnector(limit=args.concorrencia)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=conector, timeout=timeout) as sessao:
+        ids = await criar_clientes(args, sessao)
+        await criar_validadores(args, sessao)
+        return await gerar_carga(args, sessao, ids)
+
+
+def imprimir_relatorio(histogramas, resultados, decorrido):
+    sucesso, erro = histogramas['sucesso'], histogramas['erro']
+    total = sucesso.total + erro.total
+    print(f"Requisições: {total} em {decorrido:.2f}s ({total / decorrido:.1f} req/s), {erro.total} com erro")
+    print("Status: " + ", ".join(f"{k}={v}" for k, v in sorted(resultados.items(), key=str)))
+    print(f"{'Percentil':>10} {'Sucesso (ms)':>14} {'Erro (ms)':>14}")
+    for p in (50, 75, 90, 95, 99, 99.9, 99.99, 100):
+        print(f"{p:>10} {sucesso.percentil(p) / 1000:>14.3f} {erro.percentil(p) / 1000:>14.3f}")
+    print(f"{'média':>10} {sucesso.media() / 1000:>14.3f} {erro.media() / 1000:>14.3f}")
+
+
+######################################################################################################
+def main():
+    parser = argparse.ArgumentParser(description='Gerador de carga em malha aberta para o banco.')
+    parser.add_argument('--banco', default='http://localhost:5000', help='URL do serviço banco.')
+    parser.add_argument('--seletor', default='http://localhost:5001', help='URL do serviço seletor.')
+    parser.add_argument('--clientes', type=int, default=10, help='Quantidade de clientes a criar.')
+    parser.add_argument('--saldo', type=int, default=1000000, help='Saldo inicial de cada cliente.')
+    parser.add_argument('--validadores', type=int, default=4, help='Quantidade de validadores a criar.')
+    parser.add_argument('--host-validador', default='validador',
+                        help='Prefixo do host dos validadores; o i-ésimo é cadastrado como <prefixo><i>.')
+    parser.add_argument('--porta-validador', type=int, default=5002, help='Porta do primeiro validador.')
+    parser.add_argument('--prefixo', default='carga', help='Prefixo dos nomes criados.')
+    parser.add_argument('--taxa', type=float, default=10.0, help='Transferências por segundo.')
+    parser.add_argument('--duracao', type=float, default=30.0, help='Duração da carga em segundos.')
+    parser.add_argument('--concorrencia', type=int, default=32, help='Máximo de requisições simultâneas.')
+    parser.add_argument('--zipf', type=float, default=0.0, help='Expoente Zipf da escolha de contas (0 = uniforme).')
+    parser.add_argument('--valor-max', type=int, default=100, help='Valor máximo de cada transferência.')
+    parser.add_argument('--poisson', action='store_true', help='Chegadas Poisson em vez de intervalo fixo.')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Timeout de cada requisição em segundos.')
+    parser.add_argument('--seed', type=int, default=None, help='Semente do gerador aleatório.')
+    args = parser.parse_args()
+
+    if args.clientes < 2:
+        parser.error('--clientes precisa ser pelo menos 2.')
+    if args.taxa <= 0 or args.concorrencia < 1:
+        parser.error('--taxa e --concorrencia precisam ser positivos.')
+
+    histogramas, resultados, decorrido = asyncio.run(executar(args))
+    imprimir_relatorio(histogramas, resultados, decorrido)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+######################################################################################################
+# Instrumentação opcional por requisição, compartilhada por banco, seletor e validador.
+# As imagens Docker copiam este arquivo ao lado do código do serviço; fora do Docker,
+# rode os serviços com PYTHONPATH=comum a partir da raiz do repositório.
+#
+# Variáveis de ambiente:
+#   PERFIL_ATIVO=1         liga a instrumentação (desligada por padrão, sem custo).
+#   PERFIL_LIMIAR_MS=500   requisições acima deste tempo entram no buffer de lentas.
+#   PERFIL_AMOSTRA=0.01    fração das requisições executadas sob cProfile.
+#   PERFIL_BUFFER=50       quantidade de requisições lentas guardadas.
+#   PERFIL_ADMIN_TOKEN=... habilita GET /admin/perfil e o cabeçalho X-Perfil, ambos
+#                          exigindo o cabeçalho X-Perfil-Token com o mesmo valor.
+#
+# O cabeçalho X-Trace-Id é propagado entre os serviços, e X-Perfil: 1 (com o token) força
+# o cProfile e o registro da requisição, também nos serviços chamados.
+
+ATIVO = os.environ.get('PERFIL_ATIVO') == '1'
+LIMIAR = float(os.environ.get('PERFIL_LIMIAR_MS', '500')) / 1000
+AMOSTRA = float(os.environ.get('PERFIL_AMOSTRA', '0.01'))
+CABECALHO_TRACE = 'X-Trace-Id'
+CABECALHO_PERFIL = 'X-Perfil'
+CABECALHO_TOKEN = 'X-Perfil-Token'
+TOKEN_ADMIN = os.environ.get('PERFIL_ADMIN_TOKEN', '')
+
+# Buffer circular com as requisições lentas mais recentes.
+lentas = deque(maxlen=int(os.environ.get('PERFIL_BUFFER', '50')))
+
+_NULO = nullcontext()
+
+
+######################################################################################################
+# Mede o tempo de uma fase nomeada dentro da requisição atual.
+class _Fase:
+    __slots__ = ('nome', 'inicio')
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        _acumular(self.nome, time.perf_counter() - self.inicio)
+
+
+def _acumular(nome, duracao):
+    if has_request_context() and 'perfil_fases' in g:
+        g.perfil_fases[nome] = g.perfil_fases.get(nome, 0.0) + duracao
+
+
+def fase(nome):
+    if not ATIVO:
+        return _NULO
+    return _Fase(nome)
+
+
+# Cabeçalhos a enviar nas chamadas para outros serviços.
+def cabecalhos():
+    if not ATIVO or not has_request_context() or 'perfil_trace' not in g:
+        return {}
+    headers = {CABECALHO_TRACE: g.perfil_trace}
+    if g.perfil_forcado:
+        headers[CABECALHO_PERFIL] = '1'
+        headers[CABECALHO_TOKEN] = request.headers[CABECALHO_TOKEN]
+    return headers
+
+
+def _token_valido():
+    return bool(TOKEN_ADMIN) and hmac.compare_digest(request.headers.get(CABECALHO_TOKEN, ''), TOKEN_ADMIN)
+
+
+######################################################################################################
+# Hooks do Flask e do SQLAlchemy.
+def _antes():
+    g.perfil_inicio = time.perf_counter()
+    g.perfil_trace = request.headers.get(CABECALHO_TRACE) or uuid.uuid4().hex
+    g.perfil_fases = {}
+    g.perfil_forcado = request.headers.get(CABECALHO_PERFIL) == '1' and _token_valido()
+    g.perfil_profiler = None
+    if g.perfil_forcado or random.random() < AMOSTRA:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.perfil_profiler = profiler
+        except ValueError:
+            pass  # Outro profiler já ativo nesta thread.
+
+
+def _depois(response):
+    if 'perfil_inicio' not in g:
+        return response
+    duracao = time.perf_counter() - g.perfil_inicio
+    profiler = g.perfil_profiler
+    if profiler is not None:
+        profiler.disable()
+        g.perfil_profiler = None
+
+    response.headers[CABECALHO_TRACE] = g.perfil_trace
+    if duracao >= LIMIAR or g.perfil_forcado:
+        registro = {
+            'trace': g.perfil_trace,
+            'metodo': request.method,
+            'rota': request.path,
+            'status': response.status_code,
+            'duracao_ms': round(duracao * 1000, 3),
+            'fases_ms': {k: round(v * 1000, 3) for k, v in g.perfil_fases.items()},
+            'horario': time.time(),
+        }
+        if profiler is not None:
+            saida = io.StringIO()
+            pstats.Stats(profiler, stream=saida).sort_stats('cumulative').print_stats(30)
+            registro['perfil'] = saida.getvalue()
+        lentas.append(registro)
+    return response
+
+
+# Roda mesmo quando a view levanta exceção (o after_request não roda nesse caso),
+# para o profiler nunca continuar ligado na thread.
+def _encerrar(exc):
+    profiler = g.get('perfil_profiler')
+    if profiler is not None:
+        profiler.disable()
+        g.perfil_profiler = None
+
+
+def _sql_antes(conn, cursor, statement, parameters, context, executemany):
+    context._perfil_inicio = time.perf_counter()
+
+
+def _sql_depois(conn, cursor, statement, parameters, context, executemany):
+    _acumular('sql', time.perf_counter() - context._perfil_inicio)
+
+
+def listar_lentas():
+    if not _token_valido():
+        return jsonify({'error': 'Acesso negado.'}), 403
+    return jsonify(sorted(lentas, key=lambda r: r['duracao_ms'], reverse=True))
+
+
+# Registra os hooks no aplicativo. Sem PERFIL_ATIVO=1 nada é registrado.
+def init_app(app):
+    if not ATIVO:
+        return
+    app.before_request(_antes)
+    app.after_request(_depois)
+    app.teardown_request(_encerrar)
+    event.listen(Engine, 'before_cursor_execute', _sql_antes)
+    event.listen(Engine, 'after_cursor_execute', _sql_depois)
+
+    # Tempo de serialização de todas as respostas feitas com jsonify.
+    resposta_json = app.json.response
+
+    def response(*args, **kwargs):
+        with fase('jsonify'):
+            return resposta_json(*args, **kwargs)
+
+    app.json.response = response
+    if TOKEN_ADMIN:
+        app.add_url_rule('/admin/perfil', 'perfil_lentas', listar_lentas, methods=['GET'])
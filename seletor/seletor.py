@@ -10,6 +10,7 @@ import requests
 import logging
 from logging.handlers import RotatingFileHandler
 import time
+import perfil
 
 
 ######################################################################################################
@@ -22,6 +23,7 @@ app.config['DEBUG'] = True  # Habilita o modo debug.
 # Inicializa o SQLAlchemy e o Migrate para o gerenciamento do banco de dados.
 db = SQLAlchemy(app)  # Conecta o SQLAlchemy ao aplicativo Flask.
 migrate = Migrate(app, db)  # Habilita migrações do banco de dados.
+perfil.init_app(app)  # Instrumentação opcional (PERFIL_ATIVO=1).
 
 
 ######################################################################################################
@@ -141,10 +143,12 @@ def processar_transacao():
     try:
         transacao = request.json  # Obtém a transação do corpo da requisição.
         app.logger.info(f'Recebendo transação: {transacao}')
-        validadores_selecionados = selecionar_validadores(transacao['valor'])  # Seleciona validadores para a transação.
+        with perfil.fase('selecionar_validadores'):
+            validadores_selecionados = selecionar_validadores(transacao['valor'])  # Seleciona validadores para a transação.
 
         # Processa o consenso.
-        resultado_consenso = processar_consenso(validadores_selecionados, transacao)  
+        with perfil.fase('consenso'):
+            resultado_consenso = processar_consenso(validadores_selecionados, transacao)  
         app.logger.info(f'Resultado do consenso: {resultado_consenso}')
         return jsonify(resultado_consenso)
     
@@ -198,8 +202,9 @@ def processar_consenso(validadores, transacao):
 
             # URL do endpoint de validação do validador.
             url = f"http://{validador.ip}/validar_transacao"  
-            headers = {'Content-Type': 'application/json'}
-            response = requests.post(url, json=transacao, headers=headers, timeout=5)  # Envia a transação para validação.
+            headers = {'Content-Type': 'application/json', **perfil.cabecalhos()}
+            with perfil.fase('validador'):
+                response = requests.post(url, json=transacao, headers=headers, timeout=5)  # Envia a transação para validação.
 
             # Se a resposta for bem sucedida, adiciona na lista de votos.
             if response.status_code == 200:
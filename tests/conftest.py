@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'banco'))
+sys.path.insert(0, os.path.join(RAIZ, 'comum'))
+
+# A instrumentação fica desligada no app importado; test_perfil liga em um app próprio.
+os.environ.pop('PERFIL_ATIVO', None)
+
+# O banco cria as tabelas ao ser importado, então a URI precisa ser definida antes.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'teste.db')
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    # O seletor não existe nos testes: toda transação é aceita.
+    class Resposta:
+        status_code = 200
+
+    monkeypatch.setattr(main.requests, 'post', lambda *args, **kwargs: Resposta())
+    with main.app.app_context():
+        main.db.drop_all()
+        main.db.create_all()
+        yield main
+        main.db.session.remove()
@@ -0,0 +1,55 @@
+import math
+import random
+from collections import Counter
+
+import carga
+
+
+def percentil_exato(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(1, math.ceil(len(ordenados) * p / 100)) - 1]
+
+
+def test_indice_e_valor_sao_inversos():
+    histograma = carga.Histograma()
+    for indice in range(20 * carga.Histograma.SUB_BALDES):
+        assert histograma._indice(histograma._valor(indice)) == indice
+    # Cada valor cai no balde cujo limite inferior é <= valor < limite do próximo.
+    for valor in list(range(5000)) + [10 ** 6, 2 ** 40 + 12345]:
+        indice = histograma._indice(valor)
+        assert histograma._valor(indice) <= valor < histograma._valor(indice + 1)
+
+
+def test_percentis_proximos_dos_exatos():
+    rng = random.Random(42)
+    valores = [int(rng.lognormvariate(9, 1.5)) for _ in range(50000)]
+    histograma = carga.Histograma()
+    for valor in valores:
+        histograma.registrar(valor)
+
+    for p in (1, 50, 90, 99, 99.9):
+        exato = percentil_exato(valores, p)
+        aproximado = histograma.percentil(p)
+        # O percentil devolve o limite superior do balde: nunca abaixo do exato, erro < 1/128.
+        assert exato <= aproximado <= exato * (1 + 1 / carga.Histograma.SUB_BALDES)
+    assert histograma.percentil(100) == max(valores)
+    assert histograma.minimo == min(valores)
+
+
+def test_histograma_vazio():
+    assert carga.Histograma().percentil(99) == 0
+
+
+def test_zipf_com_s_zero_e_uniforme():
+    zipf = carga.Zipf(range(10), 0, random.Random(1))
+    contagens = Counter(zipf.escolher() for _ in range(50000))
+    assert set(contagens) == set(range(10))
+    assert all(abs(c - 5000) < 400 for c in contagens.values())
+
+
+def test_zipf_concentra_nas_primeiras_posicoes():
+    zipf = carga.Zipf(range(100), 1.2, random.Random(1))
+    contagens = Counter(zipf.escolher() for _ in range(50000))
+    assert contagens.most_common(1)[0][0] == zipf.itens[0]
+    esperado = 1 / sum(1 / k ** 1.2 for k in range(1, 101))
+    assert abs(contagens[zipf.itens[0]] / 50000 - esperado) < 0.02
@@ -0,0 +1,115 @@
+import time
+from datetime import datetime
+
+
+def agora():
+    # Garante horários distintos entre os passos do teste.
+    time.sleep(0.01)
+    momento = datetime.utcnow()
+    time.sleep(0.01)
+    return momento
+
+
+def saldo(client, id, em=None):
+    url = f'/cliente/{id}/saldo' + (f'?em={em.isoformat()}' if em else '')
+    return client.get(url)
+
+
+def test_saldo_no_tempo_e_reconciliacao(banco):
+    client = banco.app.test_client()
+    antes_clientes = agora()
+    ids = [client.post(f'/cliente/c{i}/1234/{qtd}').json['id'] for i, qtd in enumerate((100, 50, 0, 10, 10))]
+    t_criados = agora()
+
+    assert client.post(f'/transacoes/{ids[0]}/{ids[1]}/30').status_code == 200
+    t_1 = agora()
+
+    # Só os clientes da transferência ganham checkpoint.
+    assert banco.gerar_checkpoints() == 2
+    assert banco.SaldoCheckpoint.query.count() == 7
+    t_cp1 = agora()
+
+    assert client.post(f'/transacoes/{ids[1]}/{ids[2]}/10').status_code == 200
+    t_2 = agora()
+    assert banco.gerar_checkpoints() == 2
+    assert banco.gerar_checkpoints() == 0
+    t_cp2 = agora()
+
+    assert client.post(f'/transacoes/{ids[0]}/{ids[2]}/5').status_code == 200
+
+    assert saldo(client, ids[0], antes_clientes).status_code == 404
+    esperados = [
+        (t_criados, (100, 50, 0, 10, 10)),
+        (t_1, (70, 80, 0, 10, 10)),
+        (t_cp1, (70, 80, 0, 10, 10)),
+        (t_2, (70, 70, 10, 10, 10)),
+        (t_cp2, (70, 70, 10, 10, 10)),
+        (None, (65, 70, 15, 10, 10)),
+    ]
+    for momento, saldos in esperados:
+        assert [saldo(client, id, momento).json['saldo'] for id in ids] == list(saldos)
+
+    assert banco.reconciliar_clientes() == []
+    assert [banco.db.session.get(banco.Cliente, id).qtdMoeda for id in ids] == [65, 70, 15, 10, 10]
+
+
+def test_reconciliacao_detecta_divergencia(banco):
+    client = banco.app.test_client()
+    a = client.post('/cliente/a/1234/100').json['id']
+    b = client.post('/cliente/b/1234/100').json['id']
+    client.post(f'/transacoes/{a}/{b}/40')
+    banco.gerar_checkpoints()
+
+    cliente = banco.db.session.get(banco.Cliente, b)
+    cliente.qtdMoeda = 999
+    banco.db.session.commit()
+
+    assert banco.reconciliar_clientes() == [{'cliente': b, 'saldo': 999, 'ledger': 140}]
+
+
+def test_checkpoint_base_para_cliente_sem_checkpoint(banco):
+    client = banco.app.test_client()
+    # Cliente criado antes dos checkpoints existirem.
+    antigo = banco.Cliente(nome='antigo', senha='1234', qtdMoeda=100)
+    banco.db.session.add(antigo)
+    banco.db.session.commit()
+    novo = client.post('/cliente/novo/1234/0').json['id']
+    client.post(f'/transacoes/{antigo.id}/{novo}/25')
+
+    # Base + atual para o cliente antigo, e um para o novo.
+    assert banco.gerar_checkpoints() == 3
+    assert banco.SaldoCheckpoint.query.count() == 4
+    assert saldo(client, antigo.id, datetime(2000, 1, 1)).json['saldo'] == 100
+    assert saldo(client, antigo.id).json['saldo'] == 75
+    assert banco.reconciliar_clientes() == []
+
+
+def test_ultimo_checkpoint_acompanha_o_mais_recente(banco):
+    client = banco.app.test_client()
+    a = client.post('/cliente/a/1234/100').json['id']
+    b = client.post('/cliente/b/1234/100').json['id']
+    assert banco.ultimos_checkpoints() == {a: (0, 100), b: (0, 100)}
+
+    client.post(f'/transacoes/{a}/{b}/40')
+    banco.gerar_checkpoints()
+    assert banco.ultimos_checkpoints() == {a: (1, 60), b: (1, 140)}
+    assert banco.UltimoCheckpoint.query.count() == 2
+
+
+def test_checkpoints_periodicos(banco, monkeypatch):
+    agendados = []
+    monkeypatch.setattr(banco, 'agendar_checkpoints', agendados.append)
+    monkeypatch.delenv('WERKZEUG_RUN_MAIN', raising=False)
+
+    monkeypatch.delenv('CHECKPOINT_INTERVALO', raising=False)
+    banco.iniciar_checkpoints_periodicos(debug=False)
+    assert agendados == []
+
+    monkeypatch.setenv('CHECKPOINT_INTERVALO', '30')
+    # Processo pai do reloader não agenda; sem debug e no filho do reloader, sim.
+    banco.iniciar_checkpoints_periodicos(debug=True)
+    assert agendados == []
+    banco.iniciar_checkpoints_periodicos(debug=False)
+    monkeypatch.setenv('WERKZEUG_RUN_MAIN', 'true')
+    banco.iniciar_checkpoints_periodicos(debug=True)
+    assert agendados == [30.0, 30.0]
@@ -0,0 +1,103 @@
+import time
+from collections import deque
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import main
+import perfil
+
+TOKEN = 'segredo'
+
+
+def test_desligado_nao_registra_nada():
+    assert perfil.ATIVO is False
+    assert perfil._antes not in main.app.before_request_funcs.get(None, [])
+    assert perfil._encerrar not in main.app.teardown_request_funcs.get(None, [])
+    assert '/admin/perfil' not in [regra.rule for regra in main.app.url_map.iter_rules()]
+    assert not event.contains(Engine, 'before_cursor_execute', perfil._sql_antes)
+    assert perfil.fase('qualquer') is perfil._NULO
+    with main.app.test_request_context('/', headers={perfil.CABECALHO_TRACE: 't'}):
+        assert perfil.cabecalhos() == {}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(perfil, 'ATIVO', True)
+    monkeypatch.setattr(perfil, 'TOKEN_ADMIN', TOKEN)
+    monkeypatch.setattr(perfil, 'LIMIAR', 0)
+    monkeypatch.setattr(perfil, 'AMOSTRA', 0)
+    monkeypatch.setattr(perfil, 'lentas', deque(maxlen=3))
+
+    app = Flask(__name__)
+
+    @app.route('/propaga')
+    def propaga():
+        return jsonify(perfil.cabecalhos())
+
+    @app.route('/espera/<float:segundos>')
+    def espera(segundos):
+        for _ in range(2):
+            with perfil.fase('espera'):
+                time.sleep(segundos)
+        return jsonify([])
+
+    perfil.init_app(app)
+    yield app
+    event.remove(Engine, 'before_cursor_execute', perfil._sql_antes)
+    event.remove(Engine, 'after_cursor_execute', perfil._sql_depois)
+
+
+def listar(client):
+    return client.get('/admin/perfil', headers={perfil.CABECALHO_TOKEN: TOKEN}).json
+
+
+def test_trace_id_ecoado_e_propagado(app):
+    client = app.test_client()
+    resposta = client.get('/propaga', headers={perfil.CABECALHO_TRACE: 't1'})
+    assert resposta.headers[perfil.CABECALHO_TRACE] == 't1'
+    assert resposta.json == {perfil.CABECALHO_TRACE: 't1'}
+
+    gerado = client.get('/propaga').headers[perfil.CABECALHO_TRACE]
+    assert len(gerado) == 32
+
+
+def test_x_perfil_exige_token(app, monkeypatch):
+    monkeypatch.setattr(perfil, 'LIMIAR', 60)
+    client = app.test_client()
+
+    sem_token = client.get('/propaga', headers={perfil.CABECALHO_PERFIL: '1'})
+    assert perfil.CABECALHO_PERFIL not in sem_token.json
+    assert listar(client) == []
+
+    com_token = client.get('/propaga', headers={perfil.CABECALHO_PERFIL: '1', perfil.CABECALHO_TOKEN: TOKEN})
+    assert com_token.json[perfil.CABECALHO_PERFIL] == '1'
+    assert com_token.json[perfil.CABECALHO_TOKEN] == TOKEN
+    [registro] = listar(client)
+    assert registro['rota'] == '/propaga'
+    assert 'perfil' in registro
+
+
+def test_fases_acumuladas(app):
+    client = app.test_client()
+    client.get('/espera/0.01')
+    [registro] = listar(client)
+    assert registro['fases_ms']['espera'] >= 20
+    assert 'jsonify' in registro['fases_ms']
+
+
+def test_admin_exige_token(app):
+    client = app.test_client()
+    assert client.get('/admin/perfil').status_code == 403
+    assert client.get('/admin/perfil', headers={perfil.CABECALHO_TOKEN: 'errado'}).status_code == 403
+    assert client.get('/admin/perfil', headers={perfil.CABECALHO_TOKEN: TOKEN}).status_code == 200
+
+
+def test_buffer_guarda_as_recentes_ordenadas_por_duracao(app):
+    client = app.test_client()
+    for segundos in (0.03, 0.005, 0.02, 0.01):
+        client.get(f'/espera/{segundos}')
+    # Com maxlen=3 a primeira sai do buffer; as restantes vêm da mais lenta para a mais rápida.
+    assert [r['rota'] for r in listar(client)] == ['/espera/0.02', '/espera/0.01', '/espera/0.005']
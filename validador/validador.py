@@ -5,12 +5,14 @@ from flask_sqlalchemy import SQLAlchemy
 import os
 import logging
 from logging.handlers import RotatingFileHandler
+import perfil
 
 # Inicializa o aplicativo Flask
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'  # Define a URI do banco de dados SQLite
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Desabilita o rastreamento de modificações do SQLAlchemy para melhorar a performance
 db = SQLAlchemy(app)  # Inicializa o SQLAlchemy com o aplicativo Flask
+perfil.init_app(app)  # Instrumentação opcional (PERFIL_ATIVO=1)
 
 # Configura o log
 if not os.path.exists('logs'):
@@ -60,47 +62,48 @@ class Validador(db.Model):
 @app.route('/validar_transacao', methods=['POST'])
 def validar_transacao():
     try:
-        data = request.json  # Obtém os dados da requisição
-        app.logger.info(f'Recebendo transação para validação: {data}')
+        with perfil.fase('validacao'):
+            data = request.json  # Obtém os dados da requisição
+            app.logger.info(f'Recebendo transação para validação: {data}')
         
-        # Ajusta a formatação da data para lidar com microssegundos
-        transacao = Transacao(
-            remetente_id=data['remetente'],
-            recebedor_id=data['recebedor'],
-            valor=data['valor'],
-            horario=datetime.strptime(data['horario'], "%Y-%m-%dT%H:%M:%S.%f"),
-            chave_unica=data['chave_unica']
-        )
+            # Ajusta a formatação da data para lidar com microssegundos
+            transacao = Transacao(
+                remetente_id=data['remetente'],
+                recebedor_id=data['recebedor'],
+                valor=data['valor'],
+                horario=datetime.strptime(data['horario'], "%Y-%m-%dT%H:%M:%S.%f"),
+                chave_unica=data['chave_unica']
+            )
 
-        # Selecionando o primeiro validador de acordo com a chave única para evitar repetição.
-        validador = Validador.query.filter_by(chave_unica=transacao.chave_unica).first()
-        if not validador:
-            app.logger.warning(f'Chave única inválida: {transacao.chave_unica}')
-            return jsonify({'status': 0}), 500  # Chave única inválida - inconsistencia
+            # Selecionando o primeiro validador de acordo com a chave única para evitar repetição.
+            validador = Validador.query.filter_by(chave_unica=transacao.chave_unica).first()
+            if not validador:
+                app.logger.warning(f'Chave única inválida: {transacao.chave_unica}')
+                return jsonify({'status': 0}), 500  # Chave única inválida - inconsistencia
 
-        # Regra de saldo e taxa
-        taxa = transacao.valor * 0.2
-        if validador.saldo < (transacao+taxa):
-            app.logger.warning(f'Saldo insuficiente do validador: {validador.saldo}')
-            return jsonify({'status': 2}), 400
+            # Regra de saldo e taxa
+            taxa = transacao.valor * 0.2
+            if validador.saldo < (transacao+taxa):
+                app.logger.warning(f'Saldo insuficiente do validador: {validador.saldo}')
+                return jsonify({'status': 2}), 400
 
-        # Regra de horário da transação
-        if transacao.horario > datetime.utcnow() or transacao.horario <= validador.ultimo_horario:
-            app.logger.warning(f'Horário inválido para a transação: {transacao.horario}')
-            return jsonify({'status': 2}), 400
+            # Regra de horário da transação
+            if transacao.horario > datetime.utcnow() or transacao.horario <= validador.ultimo_horario:
+                app.logger.warning(f'Horário inválido para a transação: {transacao.horario}')
+                return jsonify({'status': 2}), 400
 
-        # Regra de limite de transações
-        if validador.transacoes_no_minuto > 100:
-            app.logger.warning(f'Limite de transações por minuto excedido')
-            return jsonify({'status': 0}), 500 # inconsistencia
+            # Regra de limite de transações
+            if validador.transacoes_no_minuto > 100:
+                app.logger.warning(f'Limite de transações por minuto excedido')
+                return jsonify({'status': 0}), 500 # inconsistencia
 
-        # Se passar por todas as validações
-        validador.ultimo_horario = transacao.horario
-        validador.transacoes_no_minuto += 1
-        transacao.status = 1  # Aprovada
-        db.session.add(transacao)
-        db.session.commit()
-        return jsonify({'status': 1}), 200
+            # Se passar por todas as validações
+            validador.ultimo_horario = transacao.horario
+            validador.transacoes_no_minuto += 1
+            transacao.status = 1  # Aprovada
+            db.session.add(transacao)
+            db.session.commit()
+            return jsonify({'status': 1}), 200
     except Exception as e:
         #Saida com return status 0
         app.logger.error(f'Erro ao validar transação: {str(e)}')